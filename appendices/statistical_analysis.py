@@ -3,19 +3,40 @@
 Análisis cuantitativo de los datos procesados para establecer políticas basadas en sample
 """
 
-import json
+import os
+import re
+import sys
+import orjson
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from collections import Counter
+from functools import lru_cache
+
+try:
+    import ahocorasick  # pyahocorasick, opcional
+except ImportError:
+    ahocorasick = None
+
+try:
+    from numba import njit, prange  # numba, opcional
+except ImportError:
+    njit = None
+
+# Usar el archivo más reciente de resultados
+DATA_SOURCE = 'cobre_complete_results_20250917_110238.json'
+# Caché columnar de los montos ya normalizados (se regenera si el JSON cambia)
+AMOUNTS_CACHE = DATA_SOURCE.replace('.json', '.amounts.parquet')
+# Tipo de los montos: float32 no alcanza (facturas de ~6.5e8 COP pierden
+# hasta 32 COP y alteran máximos, totales y P99), se mantiene float64
+AMOUNT_DTYPE = np.float64
 
 
 def load_processed_data():
     """Cargar los datos ya procesados por el sistema"""
     try:
-        # Usar el archivo más reciente de resultados
-        with open('cobre_complete_results_20250917_110238.json', 'r', encoding='utf-8') as f:
-            processed_data = json.load(f)
+        with open(DATA_SOURCE, 'rb') as f:
+            processed_data = orjson.loads(f.read())
         print(f"Cargados {len(processed_data)} registros procesados")
         return processed_data
     except FileNotFoundError:
@@ -25,87 +46,91 @@ def load_processed_data():
 def normalize_amounts_to_cop(data):
     """Normalizar todos los montos a COP para comparación uniforme"""
     COP_USD_RATE = 4200
-    normalized_amounts = []
-    amount_details = []
-    
-    for record in data:
-        extracted = record.get('extracted_data', {})
-        if not extracted:
-            continue
-            
-        try:
-            monto = float(extracted.get('monto_total', 0))
-            currency = extracted.get('moneda', '').upper()
-            
-            if currency == 'USD':
-                monto_cop = monto * COP_USD_RATE
-            else:
-                monto_cop = monto
-            
-            if monto_cop > 0:  # Solo montos válidos
-                normalized_amounts.append(monto_cop)
-                amount_details.append({
-                    'invoice_id': record['invoice_id'],
-                    'original_amount': monto,
-                    'currency': currency,
-                    'cop_normalized': monto_cop,
-                    'vendor': extracted.get('proveedor', 'Unknown')
-                })
-                
-        except (ValueError, TypeError):
-            continue
-    
-    return normalized_amounts, amount_details
+    # Tasa a COP por moneda; monedas no listadas se dejan sin convertir
+    RATES_TO_COP = {'COP': 1.0, 'USD': COP_USD_RATE}
+    
+    # Aplanar solo el primer nivel: extracted_data.* queda como columnas
+    df = pd.json_normalize(data, max_level=1)
+    df = df.reindex(columns=['invoice_id', 'extracted_data.monto_total',
+                             'extracted_data.moneda', 'extracted_data.proveedor'])
+    
+    monto = pd.to_numeric(df['extracted_data.monto_total'], errors='coerce').fillna(0).to_numpy(dtype=AMOUNT_DTYPE)
+    currency = pd.Categorical(df['extracted_data.moneda'].fillna('').astype(str).str.upper())
+    
+    # Una tasa por categoría de moneda, luego un gather por código y un producto
+    rates = np.array([RATES_TO_COP.get(c, 1.0) for c in currency.categories], dtype=AMOUNT_DTYPE)
+    monto_cop = monto * rates[currency.codes]
+    
+    valid = monto_cop > 0  # Solo montos válidos
+    vendor = pd.Categorical(df['extracted_data.proveedor'].fillna('Unknown').to_numpy()[valid])
+    
+    # Estructura columnar: vendors y monedas repetidos se guardan como categorías
+    amount_details = pd.DataFrame({
+        'invoice_id': df['invoice_id'].to_numpy()[valid].astype(np.int64),
+        'original_amount': monto[valid],
+        'currency': currency[valid].remove_unused_categories(),
+        'cop_normalized': monto_cop[valid],
+        'vendor': vendor,
+        'vendor_lc': lowercase_categories(vendor)
+    })
+    
+    return monto_cop[valid], amount_details
+
+def load_cached_amounts():
+    """Leer montos normalizados desde la caché parquet si sigue vigente"""
+    try:
+        if os.path.getmtime(AMOUNTS_CACHE) <= os.path.getmtime(DATA_SOURCE):
+            return None
+        amount_details = pd.read_parquet(AMOUNTS_CACHE)
+    except (OSError, ImportError, ValueError):
+        # Sin caché, sin motor parquet o archivo corrupto: recalcular
+        return None
+    
+    print(f"Cargados {amount_details.attrs.get('total_records', len(amount_details))} registros desde caché")
+    return amount_details
+
+def save_cached_amounts(amount_details, total_records):
+    """Guardar montos normalizados en parquet para ejecuciones siguientes"""
+    amount_details.attrs['total_records'] = total_records
+    try:
+        amount_details.to_parquet(AMOUNTS_CACHE, compression='zstd', index=False)
+    except (OSError, ImportError) as e:
+        print(f"Aviso: no se pudo guardar la caché de montos ({e})")
+
+def lowercase_categories(values):
+    """Pasar a minúsculas solo las categorías únicas y reasignar los códigos"""
+    lowered, inverse = np.unique(values.categories.str.lower(), return_inverse=True)
+    return pd.Categorical.from_codes(inverse[values.codes], categories=lowered)
 
 def calculate_statistical_thresholds(amounts):
     """Calcular percentiles para establecer umbrales estadísticamente fundamentados"""
-    amounts_array = np.array(amounts)
-    
-    percentiles = {
-        'P10': np.percentile(amounts_array, 10),
-        'P25': np.percentile(amounts_array, 25),
-        'P50': np.percentile(amounts_array, 50),  # Mediana
-        'P75': np.percentile(amounts_array, 75),
-        'P90': np.percentile(amounts_array, 90),
-        'P95': np.percentile(amounts_array, 95),
-        'P99': np.percentile(amounts_array, 99)
-    }
+    # Ordenar una sola vez: percentiles, mínimo y máximo salen del mismo arreglo
+    amounts_array = np.sort(np.asarray(amounts, dtype=AMOUNT_DTYPE))
+    
+    labels = ['P10', 'P25', 'P50', 'P75', 'P90', 'P95', 'P99']
+    quantiles = np.percentile(amounts_array, [10, 25, 50, 75, 90, 95, 99])
+    percentiles = dict(zip(labels, quantiles))  # P50 = mediana
     
     stats = {
-        'count': len(amounts),
-        'mean': np.mean(amounts_array),
-        'median': np.median(amounts_array),
-        'std': np.std(amounts_array),
-        'min': np.min(amounts_array),
-        'max': np.max(amounts_array)
+        'count': len(amounts_array),
+        'mean': amounts_array.mean(),
+        'median': quantiles[2],
+        'std': amounts_array.std(),
+        'min': amounts_array[0],
+        'max': amounts_array[-1]
     }
     
     return percentiles, stats
 
 def analyze_vendor_patterns(amount_details):
     """Analizar patrones de vendors para identificar confiables"""
-    vendor_stats = {}
-    
-    for detail in amount_details:
-        vendor = detail['vendor'].lower()
-        if vendor not in vendor_stats:
-            vendor_stats[vendor] = {
-                'count': 0,
-                'amounts': [],
-                'avg_amount': 0,
-                'currencies': []
-            }
-        
-        vendor_stats[vendor]['count'] += 1
-        vendor_stats[vendor]['amounts'].append(detail['cop_normalized'])
-        vendor_stats[vendor]['currencies'].append(detail['currency'])
+    grouped = amount_details.groupby('vendor_lc', sort=False, observed=True)['cop_normalized']
     
-    # Calcular promedios
-    for vendor in vendor_stats:
-        amounts = vendor_stats[vendor]['amounts']
-        vendor_stats[vendor]['avg_amount'] = np.mean(amounts)
-        vendor_stats[vendor]['total_volume'] = np.sum(amounts)
-        vendor_stats[vendor]['std'] = np.std(amounts) if len(amounts) > 1 else 0
+    vendor_stats = grouped.agg(['count', 'mean', 'sum']).rename(
+        columns={'mean': 'avg_amount', 'sum': 'total_volume'}
+    )
+    # Desviación poblacional (ddof=0); vendors con una sola factura quedan en 0
+    vendor_stats['std'] = grouped.std(ddof=0).fillna(0)
     
     return vendor_stats
 
@@ -138,36 +163,99 @@ def generate_risk_based_thresholds(percentiles, stats, vendor_stats):
     }
     
     # Ajustar por vendors confiables
-    frequent_vendors = [vendor for vendor, data in vendor_stats.items() 
-                       if data['count'] >= 2 and data['std'] < stats['mean']]
+    is_frequent = (vendor_stats['count'] >= 2) & (vendor_stats['std'] < stats['mean'])
+    frequent_vendors = vendor_stats.index[is_frequent].tolist()
     
     return recommendations, frequent_vendors
 
-def generate_approval_simulation(amounts, amount_details, thresholds, trusted_vendors):
-    """Simular aprobaciones con diferentes umbrales"""
-    simulation_results = {}
-    
-    for strategy_name, strategy in thresholds.items():
+@lru_cache(maxsize=8)
+def compile_vendor_matcher(trusted_vendors):
+    """Compilar una sola vez el buscador de vendors confiables (subcadenas)"""
+    if '' in trusted_vendors:
+        return lambda vendor: True
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for tv in trusted_vendors:
+            automaton.add_word(tv, tv)
+        automaton.make_automaton()
+        return lambda vendor: next(automaton.iter(vendor), None) is not None
+    
+    pattern = re.compile('|'.join(map(re.escape, trusted_vendors)))
+    return lambda vendor: pattern.search(vendor) is not None
+
+if njit is not None:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _simulate_strategy(amounts, is_trusted, auto, sup, mgr):
+        """Contar facturas por nivel de aprobación en una sola pasada"""
         auto_approved = 0
         supervisor_review = 0
         manager_review = 0
         executive_review = 0
-        
-        for detail in amount_details:
-            amount = detail['cop_normalized']
-            vendor = detail['vendor'].lower()
-            is_trusted = any(tv in vendor for tv in trusted_vendors)
-            
-            if amount <= strategy['auto_approval_cop'] and is_trusted:
-                auto_approved += 1
-            elif amount <= strategy['supervisor_max_cop']:
+        for i in prange(amounts.size):
+            a = amounts[i]
+            if a <= auto:
+                if is_trusted[i]:
+                    auto_approved += 1
+                else:
+                    supervisor_review += 1
+            elif a <= sup:
                 supervisor_review += 1
-            elif amount <= strategy['manager_max_cop']:
+            elif a <= mgr:
                 manager_review += 1
             else:
                 executive_review += 1
+        return auto_approved, supervisor_review, manager_review, executive_review
+    
+    def _simulate_strategies(amounts, is_trusted, edges):
+        """Tabla (S, 4) de conteos: un kernel compilado por estrategia"""
+        return np.array([_simulate_strategy(amounts, is_trusted, *row) for row in edges],
+                        dtype=np.int64).reshape(len(edges), 4)
+else:
+    def _simulate_strategies(amounts, is_trusted, edges):
+        """Tabla (S, 4) de conteos para todas las estrategias en un solo barrido"""
+        # Umbrales ascendentes por fila: 0=auto, 1=supervisor, 2=gerencia, 3=ejecutivo
+        buckets = (amounts[None, :] > edges[:, :, None]).sum(axis=1)
+        
+        # Montos auto-aprobables de vendors no confiables pasan a supervisión
+        buckets[(buckets == 0) & ~is_trusted[None, :]] = 1
+        
+        # Desplazar cada estrategia 4 posiciones para contar todo con un bincount
+        n_strategies = len(edges)
+        offsets = 4 * np.arange(n_strategies)[:, None]
+        return np.bincount((buckets + offsets).ravel(),
+                           minlength=4 * n_strategies).reshape(n_strategies, 4)
+
+def generate_approval_simulation(amounts, amount_details, thresholds, trusted_vendors):
+    """Simular aprobaciones con diferentes umbrales"""
+    simulation_results = {}
+    
+    amounts_cop = amount_details['cop_normalized'].to_numpy()
+    total = len(amounts_cop)
+    
+    # Vendor confiable si contiene alguno de los nombres: se evalúa una vez
+    # por categoría única y se propaga a las filas mediante los códigos
+    if trusted_vendors:
+        matcher = compile_vendor_matcher(tuple(trusted_vendors))
+        vendor_lc = amount_details['vendor_lc'].cat
+        categories = vendor_lc.categories
+        trusted_categories = np.fromiter(map(matcher, categories), dtype=bool,
+                                         count=len(categories))
+        # Código -1 (vendor nulo) cae en el False agregado al final
+        is_trusted = np.append(trusted_categories, False)[vendor_lc.codes.to_numpy()]
+    else:
+        is_trusted = np.zeros(total, dtype=bool)
+    
+    # Umbrales de todas las estrategias apilados en un arreglo contiguo (S, 3)
+    edges = np.array([[strategy['auto_approval_cop'],
+                       strategy['supervisor_max_cop'],
+                       strategy['manager_max_cop']] for strategy in thresholds.values()],
+                     dtype=AMOUNT_DTYPE).reshape(len(thresholds), 3)
+    counts = _simulate_strategies(amounts_cop, is_trusted, edges).tolist()
+    
+    for strategy_name, strategy_counts in zip(thresholds, counts):
+        auto_approved, supervisor_review, manager_review, executive_review = strategy_counts
         
-        total = len(amount_details)
         simulation_results[strategy_name] = {
             'auto_approved': auto_approved,
             'auto_approved_pct': (auto_approved / total) * 100,
@@ -181,100 +269,116 @@ def generate_approval_simulation(amounts, amount_details, thresholds, trusted_ve
     
     return simulation_results
 
+def write_lines(lines):
+    """Escribir un bloque de líneas con una sola llamada a stdout"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
 def main():
-    print("="*70)
-    print("ANÁLISIS ESTADÍSTICO REAL - UMBRALES DE APROBACIÓN COBRE")
-    print("="*70)
-    
-    # 1. Cargar datos procesados
-    processed_data = load_processed_data()
-    if not processed_data:
-        return
+    write_lines([
+        "="*70,
+        "ANÁLISIS ESTADÍSTICO REAL - UMBRALES DE APROBACIÓN COBRE",
+        "="*70,
+    ])
+    
+    # 1-2. Cargar montos normalizados (caché parquet o JSON procesado)
+    amount_details = load_cached_amounts()
+    if amount_details is not None:
+        amounts = amount_details['cop_normalized'].to_numpy()
+        total_records = amount_details.attrs.get('total_records', len(amounts))
+    else:
+        processed_data = load_processed_data()
+        if not processed_data:
+            return
+        
+        print("\n📊 NORMALIZANDO MONTOS...")
+        amounts, amount_details = normalize_amounts_to_cop(processed_data)
+        total_records = len(processed_data)
+        save_cached_amounts(amount_details, total_records)
     
-    # 2. Normalizar montos a COP
-    print("\n📊 NORMALIZANDO MONTOS...")
-    amounts, amount_details = normalize_amounts_to_cop(processed_data)
-    print(f"Facturas con montos válidos: {len(amounts)}/{len(processed_data)}")
+    # Resumen acumulado en memoria y emitido al final con una sola escritura
+    lines = [f"Facturas con montos válidos: {len(amounts)}/{total_records}"]
     
     # 3. Análisis estadístico
-    print("\n📈 CALCULANDO ESTADÍSTICAS...")
+    lines.append("\n📈 CALCULANDO ESTADÍSTICAS...")
     percentiles, stats = calculate_statistical_thresholds(amounts)
     
-    print(f"\nESTADÍSTICAS DESCRIPTIVAS:")
-    print(f"  Facturas válidas: {stats['count']}")
-    print(f"  Media: ${stats['mean']:,.0f} COP")
-    print(f"  Mediana: ${stats['median']:,.0f} COP")
-    print(f"  Desv. Estándar: ${stats['std']:,.0f} COP")
-    print(f"  Rango: ${stats['min']:,.0f} - ${stats['max']:,.0f} COP")
+    lines.append(f"\nESTADÍSTICAS DESCRIPTIVAS:")
+    lines.append(f"  Facturas válidas: {stats['count']}")
+    lines.append(f"  Media: ${stats['mean']:,.0f} COP")
+    lines.append(f"  Mediana: ${stats['median']:,.0f} COP")
+    lines.append(f"  Desv. Estándar: ${stats['std']:,.0f} COP")
+    lines.append(f"  Rango: ${stats['min']:,.0f} - ${stats['max']:,.0f} COP")
     
-    print(f"\nPERCENTILES:")
-    for p, value in percentiles.items():
-        print(f"  {p}: ${value:,.0f} COP (${value/4200:,.0f} USD)")
+    lines.append(f"\nPERCENTILES:")
+    lines.extend(f"  {p}: ${value:,.0f} COP (${value/4200:,.0f} USD)"
+                 for p, value in percentiles.items())
     
     # 4. Análisis de vendors
-    print("\n🏢 ANALIZANDO PATRONES DE VENDORS...")
+    lines.append("\n🏢 ANALIZANDO PATRONES DE VENDORS...")
     vendor_stats = analyze_vendor_patterns(amount_details)
     
-    print(f"Vendors únicos encontrados: {len(vendor_stats)}")
-    top_vendors = sorted(vendor_stats.items(), 
-                        key=lambda x: x[1]['total_volume'], reverse=True)[:10]
+    lines.append(f"Vendors únicos encontrados: {len(vendor_stats)}")
+    top_vendors = vendor_stats.sort_values('total_volume', ascending=False, kind='stable').head(10)
     
-    print("\nTop 10 vendors por volumen:")
-    for vendor, data in top_vendors:
-        print(f"  {vendor}: {data['count']} facturas, ${data['total_volume']:,.0f} COP total")
+    lines.append("\nTop 10 vendors por volumen:")
+    lines.extend(f"  {vendor}: {count} facturas, ${total_volume:,.0f} COP total"
+                 for vendor, count, total_volume in zip(top_vendors.index, top_vendors['count'],
+                                                        top_vendors['total_volume']))
     
     # 5. Generar recomendaciones de umbrales
-    print("\n🎯 GENERANDO UMBRALES RECOMENDADOS...")
+    lines.append("\n🎯 GENERANDO UMBRALES RECOMENDADOS...")
     threshold_strategies, trusted_vendors = generate_risk_based_thresholds(
         percentiles, stats, vendor_stats
     )
     
-    print(f"\nVendors confiables identificados: {len(trusted_vendors)}")
-    print(f"  {trusted_vendors}")
+    lines.append(f"\nVendors confiables identificados: {len(trusted_vendors)}")
+    lines.append(f"  {trusted_vendors}")
     
     # 6. Simular aprobaciones
-    print("\n🔄 SIMULANDO APROBACIONES...")
+    lines.append("\n🔄 SIMULANDO APROBACIONES...")
     simulation_results = generate_approval_simulation(
         amounts, amount_details, threshold_strategies, trusted_vendors
     )
     
-    print(f"\nRESULTADOS DE SIMULACIÓN:")
-    print("-" * 80)
+    lines.append(f"\nRESULTADOS DE SIMULACIÓN:")
+    lines.append("-" * 80)
     for strategy, results in simulation_results.items():
-        print(f"\n{strategy.upper()}: {threshold_strategies[strategy]['description']}")
-        print(f"  Auto-aprobadas: {results['auto_approved']} ({results['auto_approved_pct']:.1f}%)")
-        print(f"  Supervisión: {results['supervisor_review']} ({results['supervisor_pct']:.1f}%)")
-        print(f"  Gerencia: {results['manager_review']} ({results['manager_pct']:.1f}%)")
-        print(f"  Ejecutivos: {results['executive_review']} ({results['executive_pct']:.1f}%)")
+        lines.extend([
+            f"\n{strategy.upper()}: {threshold_strategies[strategy]['description']}",
+            f"  Auto-aprobadas: {results['auto_approved']} ({results['auto_approved_pct']:.1f}%)",
+            f"  Supervisión: {results['supervisor_review']} ({results['supervisor_pct']:.1f}%)",
+            f"  Gerencia: {results['manager_review']} ({results['manager_pct']:.1f}%)",
+            f"  Ejecutivos: {results['executive_review']} ({results['executive_pct']:.1f}%)",
+        ])
     
     # 7. Recomendación final
-    print("\n" + "="*70)
-    print("🎯 RECOMENDACIÓN PARA COBRE")
-    print("="*70)
+    lines.append("\n" + "="*70)
+    lines.append("🎯 RECOMENDACIÓN PARA COBRE")
+    lines.append("="*70)
     
     recommended_strategy = 'balanced'  # Mejor balance para startup fintech
     recommended = threshold_strategies[recommended_strategy]
     
-    print(f"\nESTRATEGIA RECOMENDADA: {recommended_strategy.upper()}")
-    print(f"Descripción: {recommended['description']}")
-    print(f"\nUMBRALES RECOMENDADOS:")
-    print(f"  AUTO_APPROVAL_COP = {recommended['auto_approval_cop']:,}")
-    print(f"  SUPERVISOR_MAX_COP = {recommended['supervisor_max_cop']:,}")
-    print(f"  MANAGER_MAX_COP = {recommended['manager_max_cop']:,}")
-    print(f"  EXECUTIVE_THRESHOLD = {recommended['executive_threshold']:,}")
+    lines.append(f"\nESTRATEGIA RECOMENDADA: {recommended_strategy.upper()}")
+    lines.append(f"Descripción: {recommended['description']}")
+    lines.append(f"\nUMBRALES RECOMENDADOS:")
+    lines.append(f"  AUTO_APPROVAL_COP = {recommended['auto_approval_cop']:,}")
+    lines.append(f"  SUPERVISOR_MAX_COP = {recommended['supervisor_max_cop']:,}")
+    lines.append(f"  MANAGER_MAX_COP = {recommended['manager_max_cop']:,}")
+    lines.append(f"  EXECUTIVE_THRESHOLD = {recommended['executive_threshold']:,}")
     
     # Equivalentes en USD
-    print(f"\nEQUIVALENTES USD (tasa: 1 USD = 4,200 COP):")
-    print(f"  AUTO_APPROVAL_USD = {recommended['auto_approval_cop']/4200:,.0f}")
-    print(f"  SUPERVISOR_MAX_USD = {recommended['supervisor_max_cop']/4200:,.0f}")
-    print(f"  MANAGER_MAX_USD = {recommended['manager_max_cop']/4200:,.0f}")
+    lines.append(f"\nEQUIVALENTES USD (tasa: 1 USD = 4,200 COP):")
+    lines.append(f"  AUTO_APPROVAL_USD = {recommended['auto_approval_cop']/4200:,.0f}")
+    lines.append(f"  SUPERVISOR_MAX_USD = {recommended['supervisor_max_cop']/4200:,.0f}")
+    lines.append(f"  MANAGER_MAX_USD = {recommended['manager_max_cop']/4200:,.0f}")
     
     # Justificación
-    print(f"\n📋 JUSTIFICACIÓN:")
+    lines.append(f"\n📋 JUSTIFICACIÓN:")
     expected_results = simulation_results[recommended_strategy]
-    print(f"  - {expected_results['auto_approved_pct']:.1f}% auto-aprobación (apropiado para fintech startup)")
-    print(f"  - {expected_results['supervisor_pct'] + expected_results['manager_pct']:.1f}% revisión humana (control de riesgo)")
-    print(f"  - {expected_results['executive_pct']:.1f}% escalación ejecutiva (decisiones estratégicas)")
+    lines.append(f"  - {expected_results['auto_approved_pct']:.1f}% auto-aprobación (apropiado para fintech startup)")
+    lines.append(f"  - {expected_results['supervisor_pct'] + expected_results['manager_pct']:.1f}% revisión humana (control de riesgo)")
+    lines.append(f"  - {expected_results['executive_pct']:.1f}% escalación ejecutiva (decisiones estratégicas)")
     
     # Guardar resultados
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -282,26 +386,29 @@ def main():
     
     analysis_results = {
         'analysis_date': datetime.now().isoformat(),
-        'data_source': 'cobre_complete_results_20250917_110238.json',
+        'data_source': DATA_SOURCE,
         'statistics': {
-            'percentiles': {k: float(v) for k, v in percentiles.items()},
-            'descriptive': {k: float(v) for k, v in stats.items()}
+            'percentiles': percentiles,
+            'descriptive': stats
         },
         'recommended_thresholds': recommended,
         'simulation_results': simulation_results,
         'trusted_vendors': trusted_vendors,
-        'vendor_analysis': {k: {
-            'count': v['count'],
-            'avg_amount': float(v['avg_amount']),
-            'total_volume': float(v['total_volume'])
-        } for k, v in vendor_stats.items()}
+        'vendor_analysis': vendor_stats[['count', 'avg_amount', 'total_volume']].to_dict(orient='index')
     }
     
-    with open(results_file, 'w', encoding='utf-8') as f:
-        json.dump(analysis_results, f, indent=2, ensure_ascii=False)
+    # orjson serializa escalares NumPy directamente y escribe UTF-8 sin escapes
+    with open(results_file, 'wb') as f:
+        f.write(orjson.dumps(
+            analysis_results,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        ))
+    
+    lines.append(f"\n💾 Análisis detallado guardado en: {results_file}")
+    lines.append(f"\n🚀 Estos umbrales pueden implementarse en scalable_invoice_processor.py")
     
-    print(f"\n💾 Análisis detallado guardado en: {results_file}")
-    print(f"\n🚀 Estos umbrales pueden implementarse en scalable_invoice_processor.py")
+    # Todo el resumen sale en una sola escritura a stdout
+    write_lines(lines)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
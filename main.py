@@ -10,13 +10,14 @@ Business Impact:
 - Real-time risk scoring and compliance
 """
 
-import json
 import time
+import logging
 import argparse
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 
+import orjson
 import pandas as pd
 
 from src.workflows.invoice_workflow import InvoiceWorkflow
@@ -81,40 +82,40 @@ class CobreInvoiceProcessor:
     
     def _process_batch(self, df: pd.DataFrame) -> List[Dict]:
         """
-        Process a batch of invoices with progress tracking 
+        Process a batch of invoices concurrently with progress tracking 
+        
+        Delegates to InvoiceWorkflow.process_batch, which runs invoices on a
+        thread pool sized by settings.max_workers; the LLM call dominates each
+        invoice, so threads overlap network waits. Results keep the input order.
         """
-        results = []
-        start_time = time.time()
+        start_time = time.perf_counter()
         total_invoices = len(df)
+        log_progress = logger.isEnabledFor(logging.INFO)
+        progress_every = max(1, total_invoices // 20)
+        max_workers = max(1, min(self.workflow.settings.max_workers, total_invoices))
         
-        logger.info(f"Starting batch processing: {total_invoices} invoices")
+        logger.info(
+            f"Starting batch processing: {total_invoices} invoices "
+            f"({max_workers} workers)"
+        )
         
-        for i, (_, row) in enumerate(df.iterrows(), 1):
-            try:
-                # Process individual invoice using the modular workflow
-                result = self.workflow.process_single_invoice(
-                    invoice_id=int(row['id']), 
-                    content=row['content']
-                )
-                results.append(result)
+        def report_progress(completed: int, total: int, invoice_id: int, result: Optional[Dict]) -> None:
+            # Progress logging 
+            if log_progress and (completed % progress_every == 0 or completed == total):
+                elapsed = time.perf_counter() - start_time
+                avg_time = elapsed / completed
+                eta = avg_time * (total - completed)
                 
-                # Progress logging 
-                if i % 10 == 0 or i == total_invoices:
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / i
-                    eta = avg_time * (total_invoices - i)
-                    
-                    logger.info(
-                        f"Progress: {i}/{total_invoices} ({i/total_invoices*100:.1f}%) "
-                        f"- ETA: {eta:.1f}s"
-                    )
-                
-            except Exception as e:
-                logger.error(f"Failed to process invoice {row['id']}: {e}")
-                # Continue processing other invoices
-                continue
+                logger.info(
+                    f"Progress: {completed}/{total} "
+                    f"({completed/total*100:.1f}%) - ETA: {eta:.1f}s"
+                )
+        
+        # Columnar access avoids building a Series per row
+        invoices = zip(map(int, df['id'].tolist()), df['content'].tolist())
+        results = self.workflow.process_batch(invoices, on_progress=report_progress)
         
-        total_time = time.time() - start_time
+        total_time = time.perf_counter() - start_time
         logger.info(f"Batch processing completed in {total_time:.1f}s")
         
         return results
@@ -127,8 +128,8 @@ class CobreInvoiceProcessor:
         output_file = Path(output_dir) / f"cobre_enhanced_results_{timestamp}.json"
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
             
             logger.info(f"Results saved: {output_file}")
             return str(output_file)
@@ -2,88 +2,129 @@
 """
 Business rules and approval policies for invoice processing
 """
-from dataclasses import dataclass
-from typing import Dict, List
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
 
-@dataclass
+# Shared, read-only defaults
+_CRITICAL_FIELDS = ("numero_factura", "proveedor", "monto_total")
+
+_RISK_FACTORS = MappingProxyType({
+    'validation_errors': 0.4,      # 40% weight for errors
+    'document_type': 0.2,          # 20% for document type
+    'amount_threshold': 0.2,       # 20% for amount
+    'data_completeness': 0.2       # 20% for data completeness
+})
+
+_CRITICAL_ANOMALIES = (
+    "numero_factura faltante",
+    "proveedor faltante",
+    "monto_total faltante",
+    "monto inválido o cero"
+)
+
+@lru_cache(maxsize=None)
+def _build_document_rules(auto_approval_cop: int) -> Mapping[str, Mapping]:
+    """Build document type rules once per auto-approval threshold"""
+    return MappingProxyType({
+        'credit_note': MappingProxyType({
+            'max_auto_approval': 0,  # Never auto-approve credit notes
+            'min_approval_level': 'manager_review',
+            'risk_multiplier': 1.3
+        }),
+        'email': MappingProxyType({
+            'max_auto_approval': auto_approval_cop * 0.7,  # More restrictive
+            'min_approval_level': 'supervisor_review',
+            'risk_multiplier': 1.2
+        }),
+        'json': MappingProxyType({
+            'max_auto_approval': auto_approval_cop * 0.8,
+            'min_approval_level': 'supervisor_review',
+            'risk_multiplier': 1.1
+        }),
+        'formal_invoice': MappingProxyType({
+            'max_auto_approval': auto_approval_cop,  # Full value
+            'min_approval_level': 'auto_approved',
+            'risk_multiplier': 1.0
+        })
+    })
+
+@lru_cache(maxsize=None)
+def _build_default_rules(auto_approval_cop: int) -> Mapping:
+    """Fallback rules for unknown document types"""
+    return MappingProxyType({
+        'max_auto_approval': auto_approval_cop * 0.5,
+        'min_approval_level': 'manager_review',
+        'risk_multiplier': 1.2
+    })
+
+@lru_cache(maxsize=None)
+def _compile_critical_pattern(critical_anomalies: Tuple[str, ...]) -> re.Pattern:
+    """Compile critical anomalies into a single substring matcher"""
+    if not critical_anomalies:
+        return re.compile(r"(?!)")  # Never matches
+    return re.compile("|".join(re.escape(critical.lower()) for critical in critical_anomalies))
+
+@dataclass(frozen=True)
 class ApprovalPolicies:
     """Enhanced approval policies with multi-factor risk scoring"""
-    
-    # Basic approval thresholds 
-    AUTO_APPROVAL_COP: int = 18_417_000     
-    AUTO_APPROVAL_USD: int = 4_385          
-    SUPERVISOR_MAX_COP: int = 47_329_800    
-    SUPERVISOR_MAX_USD: int = 11_269        
-    MANAGER_MAX_COP: int = 190_680_000      
-    MANAGER_MAX_USD: int = 45_400           
-    
+
+    # Basic approval thresholds
+    AUTO_APPROVAL_COP: int = 18_417_000
+    AUTO_APPROVAL_USD: int = 4_385
+    SUPERVISOR_MAX_COP: int = 47_329_800
+    SUPERVISOR_MAX_USD: int = 11_269
+    MANAGER_MAX_COP: int = 190_680_000
+    MANAGER_MAX_USD: int = 45_400
+
     # Exchange rate
     COP_USD_RATE: int = 4200
-    
+
     # Critical fields for validation
-    CRITICAL_FIELDS: List[str] = None
-    
-    # Document type specific rules 
-    DOCUMENT_TYPE_RULES: Dict[str, Dict] = None
-    
-    # Risk scoring factors (weights) 
-    RISK_FACTORS: Dict[str, float] = None
-    
+    CRITICAL_FIELDS: Optional[Tuple[str, ...]] = None
+
+    # Document type specific rules
+    DOCUMENT_TYPE_RULES: Optional[Mapping[str, Mapping]] = None
+
+    # Risk scoring factors (weights)
+    RISK_FACTORS: Optional[Mapping[str, float]] = None
+
     # Critical anomalies that force rejection
-    CRITICAL_ANOMALIES: List[str] = None
-    
+    CRITICAL_ANOMALIES: Optional[Tuple[str, ...]] = None
+
+    # Derived lookups, built once in __post_init__
+    _default_rules: Mapping = field(init=False, repr=False, compare=False)
+    _critical_pattern: re.Pattern = field(init=False, repr=False, compare=False)
+
     def __post_init__(self):
+        # Frozen dataclass: derived values are set through object.__setattr__
+        set_attr = object.__setattr__
+
         if self.CRITICAL_FIELDS is None:
-            self.CRITICAL_FIELDS = ["numero_factura", "proveedor", "monto_total"]
-        
+            set_attr(self, "CRITICAL_FIELDS", _CRITICAL_FIELDS)
+        else:
+            set_attr(self, "CRITICAL_FIELDS", tuple(self.CRITICAL_FIELDS))
+
         if self.DOCUMENT_TYPE_RULES is None:
-            self.DOCUMENT_TYPE_RULES = {
-                'credit_note': {
-                    'max_auto_approval': 0,  # Never auto-approve credit notes
-                    'min_approval_level': 'manager_review',
-                    'risk_multiplier': 1.3
-                },
-                'email': {
-                    'max_auto_approval': self.AUTO_APPROVAL_COP * 0.7,  # More restrictive
-                    'min_approval_level': 'supervisor_review',
-                    'risk_multiplier': 1.2
-                },
-                'json': {
-                    'max_auto_approval': self.AUTO_APPROVAL_COP * 0.8,
-                    'min_approval_level': 'supervisor_review', 
-                    'risk_multiplier': 1.1
-                },
-                'formal_invoice': {
-                    'max_auto_approval': self.AUTO_APPROVAL_COP,  # Full value
-                    'min_approval_level': 'auto_approved',
-                    'risk_multiplier': 1.0
-                }
-            }
-        
+            set_attr(self, "DOCUMENT_TYPE_RULES", _build_document_rules(self.AUTO_APPROVAL_COP))
+
         if self.RISK_FACTORS is None:
-            self.RISK_FACTORS = {
-                'validation_errors': 0.4,      # 40% weight for errors
-                'document_type': 0.2,          # 20% for document type
-                'amount_threshold': 0.2,       # 20% for amount
-                'data_completeness': 0.2       # 20% for data completeness
-            }
-        
+            set_attr(self, "RISK_FACTORS", _RISK_FACTORS)
+
         if self.CRITICAL_ANOMALIES is None:
-            self.CRITICAL_ANOMALIES = [
-                "numero_factura faltante",
-                "proveedor faltante", 
-                "monto_total faltante",
-                "monto inválido o cero"
-            ]
-    
-    def get_document_rules(self, doc_type: str) -> Dict:
+            set_attr(self, "CRITICAL_ANOMALIES", _CRITICAL_ANOMALIES)
+        else:
+            set_attr(self, "CRITICAL_ANOMALIES", tuple(self.CRITICAL_ANOMALIES))
+
+        set_attr(self, "_default_rules", _build_default_rules(self.AUTO_APPROVAL_COP))
+        set_attr(self, "_critical_pattern", _compile_critical_pattern(self.CRITICAL_ANOMALIES))
+
+    def get_document_rules(self, doc_type: str) -> Mapping:
         """Get rules for specific document type with fallback"""
-        return self.DOCUMENT_TYPE_RULES.get(doc_type, {
-            'max_auto_approval': self.AUTO_APPROVAL_COP * 0.5,
-            'min_approval_level': 'manager_review',
-            'risk_multiplier': 1.2
-        })
-    
+        return self.DOCUMENT_TYPE_RULES.get(doc_type, self._default_rules)
+
     def is_critical_anomaly(self, anomaly: str) -> bool:
         """Check if anomaly is critical"""
-        return any(critical in anomaly.lower() for critical in self.CRITICAL_ANOMALIES)
\ No newline at end of file
+        return self._critical_pattern.search(anomaly.lower()) is not None
@@ -79,6 +79,8 @@ def get_settings() -> Settings:
     """Get global settings instance"""
     global settings
     if settings is None:
-        settings = Settings.from_env()
-        settings.validate()
+        # Published only once valid, so a failed first call is retried
+        loaded = Settings.from_env()
+        loaded.validate()
+        settings = loaded
     return settings
\ No newline at end of file
@@ -2,41 +2,110 @@
 """
 Metrics and measurement classes for invoice processing
 """
+import threading
 from dataclasses import dataclass, field
 from typing import List
 
-@dataclass 
+import numpy as np
+
+# Approval decisions tracked in ProcessingMetrics.approval_counts, in order
+APPROVAL_DECISIONS = (
+    "auto_approved",
+    "supervisor_review",
+    "manager_review",
+    "executive_review",
+    "rejected"
+)
+DECISION_INDEX = {decision: i for i, decision in enumerate(APPROVAL_DECISIONS)}
+
+# Anomaly counters tracked in ProcessingMetrics.anomaly_counts, in order
+ANOMALY_COUNTERS = (
+    "validation_errors_count",
+    "critical_anomalies_detected",
+    "document_type_escalations",
+    "high_risk_scores"
+)
+COUNTER_INDEX = {counter: i for i, counter in enumerate(ANOMALY_COUNTERS)}
+
+def _array_counter(array_name: str, index: int, doc: str) -> property:
+    """Int view of one slot of a counter array, kept for attribute-style access"""
+    def getter(self) -> int:
+        return int(getattr(self, array_name)[index])
+    
+    def setter(self, value: int) -> None:
+        getattr(self, array_name)[index] = value
+    
+    return property(getter, setter, doc=doc)
+
+def _approval_counter(decision: str) -> property:
+    """Int view of one approval_counts slot"""
+    return _array_counter(
+        "approval_counts", DECISION_INDEX[decision], f"Number of invoices routed to {decision}"
+    )
+
+def _anomaly_counter(counter: str) -> property:
+    """Int view of one anomaly_counts slot"""
+    return _array_counter("anomaly_counts", COUNTER_INDEX[counter], counter.replace("_", " ").capitalize())
+
+@dataclass(slots=True)
 class ProcessingMetrics:
     """Enhanced metrics with anomaly tracking"""
     total_processed: int = 0
-    auto_approved: int = 0
-    supervisor_review: int = 0
-    manager_review: int = 0
-    executive_review: int = 0
-    rejected: int = 0
-    
-    # Enhanced anomaly metrics
-    validation_errors_count: int = 0
-    critical_anomalies_detected: int = 0
-    document_type_escalations: int = 0
-    high_risk_scores: int = 0
+    
+    # One counter per approval decision, indexed by DECISION_INDEX
+    approval_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(len(APPROVAL_DECISIONS), dtype=np.int64),
+        compare=False
+    )
+    
+    # Enhanced anomaly metrics, one counter each, indexed by COUNTER_INDEX
+    anomaly_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(len(ANOMALY_COUNTERS), dtype=np.int64),
+        compare=False
+    )
     
     # Performance metrics
     processing_time_total: float = 0.0
     api_calls_used: int = 0
     errors: List[str] = field(default_factory=list)
     
+    # Guards counter updates when invoices are processed concurrently
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    auto_approved = _approval_counter("auto_approved")
+    supervisor_review = _approval_counter("supervisor_review")
+    manager_review = _approval_counter("manager_review")
+    executive_review = _approval_counter("executive_review")
+    rejected = _approval_counter("rejected")
+    
+    validation_errors_count = _anomaly_counter("validation_errors_count")
+    critical_anomalies_detected = _anomaly_counter("critical_anomalies_detected")
+    document_type_escalations = _anomaly_counter("document_type_escalations")
+    high_risk_scores = _anomaly_counter("high_risk_scores")
+    
+    def increment(self, counter: str, n: int = 1) -> None:
+        """Add n to one anomaly counter (see ANOMALY_COUNTERS)"""
+        index = COUNTER_INDEX[counter]
+        with self.lock:
+            self.anomaly_counts[index] += n
+    
+    def record_decision(self, decision: str) -> None:
+        """Count one approval decision; untracked decisions are ignored"""
+        index = DECISION_INDEX.get(decision)
+        if index is not None:
+            with self.lock:
+                self.approval_counts[index] += 1
+    
     def get_approval_summary(self) -> dict:
         """Returns approval distribution summary"""
         if self.total_processed == 0:
             return {}
         
+        # One vectorized divide for all decisions; round() per value as before
+        percentages = (self.approval_counts / self.total_processed * 100).tolist()
         return {
-            "auto_approved_pct": round(self.auto_approved / self.total_processed * 100, 1),
-            "supervisor_review_pct": round(self.supervisor_review / self.total_processed * 100, 1),
-            "manager_review_pct": round(self.manager_review / self.total_processed * 100, 1),
-            "executive_review_pct": round(self.executive_review / self.total_processed * 100, 1),
-            "rejected_pct": round(self.rejected / self.total_processed * 100, 1)
+            f"{decision}_pct": round(pct, 1)
+            for decision, pct in zip(APPROVAL_DECISIONS, percentages)
         }
     
     def get_processing_stats(self) -> dict:
@@ -2,7 +2,8 @@
 """
 Intelligent approval routing processor with compliance rules
 """
-from typing import Tuple
+from functools import lru_cache
+from typing import Callable, Tuple
 
 from ..models.state import EnhancedProcessingState
 from ..models.metrics import ProcessingMetrics
@@ -11,12 +12,75 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Thousands separators and currency symbol dropped in one translate pass
+_AMOUNT_STRIP = str.maketrans("", "", ",$")
+
+# Prebuilt (decision, reason) results for routes with a fixed reason
+_CREDIT_NOTE_MANAGER = ("manager_review", "Credit note - Requires management review by policy")
+_CREDIT_NOTE_EXECUTIVE = ("executive_review", "High-amount credit note - Requires executive approval")
+
+_EMAIL_SUPERVISOR = ("supervisor_review", "Email - Requires minimum supervision")
+_EMAIL_MANAGER = ("manager_review", "Medium-amount email - Escalated by document type")
+_EMAIL_EXECUTIVE = ("executive_review", "High-amount email - Maximum review required")
+
+_FORMAL_INVOICE_AUTO = ("auto_approved", "Formal invoice, low amount, acceptable risk score")
+
+_FORMAL_INVOICE_SUPERVISOR = ("supervisor_review", "Formal invoice, medium amount")
+_FORMAL_INVOICE_MANAGER = ("manager_review", "Formal invoice, high amount")
+_FORMAL_INVOICE_EXECUTIVE = ("executive_review", "Formal invoice, very high amount")
+
+def _build_formal_invoice_router(policies: ApprovalPolicies) -> Callable[..., Tuple[str, str]]:
+    """
+    Specialize formal invoice routing for one policy set
+    
+    The thresholds never change after construction, so they are bound as
+    closure constants instead of being read from the policies on each call.
+    """
+    auto_cop, auto_usd = policies.AUTO_APPROVAL_COP, policies.AUTO_APPROVAL_USD
+    supervisor_cop, supervisor_usd = policies.SUPERVISOR_MAX_COP, policies.SUPERVISOR_MAX_USD
+    manager_cop, manager_usd = policies.MANAGER_MAX_COP, policies.MANAGER_MAX_USD
+    
+    def route_formal_invoice(doc_type: str, monto_cop: float, monto_usd: float,
+                             risk_score: float, errors: list, doc_rules: dict) -> Tuple[str, str]:
+        """Formal invoices follow standard logic """
+        if (monto_cop <= auto_cop and monto_usd <= auto_usd and
+            risk_score < 0.3 and not errors):
+            return _FORMAL_INVOICE_AUTO
+        elif monto_cop <= supervisor_cop and monto_usd <= supervisor_usd:
+            return _FORMAL_INVOICE_SUPERVISOR
+        elif monto_cop <= manager_cop and monto_usd <= manager_usd:
+            return _FORMAL_INVOICE_MANAGER
+        else:
+            return _FORMAL_INVOICE_EXECUTIVE
+    
+    return route_formal_invoice
+
+@lru_cache(maxsize=32)
+def _other_document_routes(doc_type: str) -> Tuple[Tuple[str, str], ...]:
+    """Supervisor, manager and executive results for a generic document type"""
+    return (
+        ("supervisor_review", f"Document {doc_type} - Supervision by precaution"),
+        ("manager_review", f"Document {doc_type} - Amount requires management"),
+        ("executive_review", f"Document {doc_type} - High amount requires executives"),
+    )
+
 class ApprovalRouter:
     """Routes invoices through intelligent approval workflows"""
     
     def __init__(self, policies: ApprovalPolicies, metrics: ProcessingMetrics):
         self.policies = policies
         self.metrics = metrics
+        
+        # Policy limits read once; they never change after construction
+        self._supervisor_max_cop = policies.SUPERVISOR_MAX_COP
+        self._manager_max_cop = policies.MANAGER_MAX_COP
+        
+        # Document-specific routers share one signature; anything else uses the generic route
+        self._routers = {
+            'credit_note': self._route_credit_note,
+            'email': self._route_email,
+            'formal_invoice': _build_formal_invoice_router(policies)
+        }
         logger.info("ApprovalRouter initialized with enhanced compliance rules")
     
     def intelligent_approval_routing_with_compliance(self, state: EnhancedProcessingState) -> EnhancedProcessingState:
@@ -54,14 +118,14 @@ class ApprovalRouter:
         """
         Determine approval decision based on comprehensive business rules 
         """
-        # Rule 1: Automatic rejection for critical errors 
-        if self._should_reject_for_critical_errors(errors, risk_score):
-            if errors and any(self.policies.is_critical_anomaly(error.lower()) for error in errors):
-                return "rejected", f"Critical errors detected: {len(errors)} - Compliance violation"
-            else:
-                return "rejected", f"Risk score too high ({risk_score:.2f}) - Auto-rejected"
+        # Rule 1: Automatic rejection for critical errors (single anomaly scan,
+        # skipped entirely when there are no errors), then for high risk 
+        if self._has_critical_errors(errors):
+            return "rejected", f"Critical errors detected: {len(errors)} - Compliance violation"
+        if risk_score >= 0.8:
+            return "rejected", f"Risk score too high ({risk_score:.2f}) - Auto-rejected"
         
-        # Rule 2: Apply document-specific routing logic 
+        # Rule 2: Apply document-specific routing logic (amounts parsed only now) 
         try:
             monto_cop, monto_usd = self._normalize_amounts(data)
             return self._route_by_document_type(doc_type, monto_cop, monto_usd, risk_score, errors)
@@ -71,16 +135,15 @@ class ApprovalRouter:
             self.metrics.errors.append(f"Routing error: {e}")
             return "manual_review", error_msg
     
-    def _should_reject_for_critical_errors(self, errors: list, risk_score: float) -> bool:
-        """Check if invoice should be automatically rejected """
-        critical_errors_detected = any(
+    def _has_critical_errors(self, errors: list) -> bool:
+        """Check if any validation error is a critical anomaly """
+        return bool(errors) and any(
             self.policies.is_critical_anomaly(error.lower()) for error in errors
         )
-        return (errors and critical_errors_detected) or risk_score >= 0.8
     
     def _normalize_amounts(self, data: dict) -> Tuple[float, float]:
         """Normalize amounts to both COP and USD"""
-        monto_str = str(data.get("monto_total", "0")).replace(",", "").replace("$", "")
+        monto_str = str(data.get("monto_total", "0")).translate(_AMOUNT_STRIP)
         monto = float(monto_str)
         currency = data.get("moneda", "").upper()
         
@@ -98,78 +161,42 @@ class ApprovalRouter:
         """Route based on document type specific rules """
         
         doc_rules = self.policies.get_document_rules(doc_type)
-        
-        if doc_type == 'credit_note':
-            return self._route_credit_note(monto_cop, doc_rules)
-            
-        elif doc_type == 'email':
-            return self._route_email(monto_cop, risk_score, errors, doc_rules)
-            
-        elif doc_type == 'formal_invoice':
-            return self._route_formal_invoice(monto_cop, monto_usd, risk_score, errors)
-            
-        else:
-            return self._route_other_document(doc_type, monto_cop, risk_score, doc_rules)
+        router = self._routers.get(doc_type, self._route_other_document)
+        return router(doc_type, monto_cop, monto_usd, risk_score, errors, doc_rules)
     
-    def _route_credit_note(self, monto_cop: float, doc_rules: dict) -> Tuple[str, str]:
+    def _route_credit_note(self, doc_type: str, monto_cop: float, monto_usd: float,
+                           risk_score: float, errors: list, doc_rules: dict) -> Tuple[str, str]:
         """Credit notes never auto-approve """
-        if monto_cop <= self.policies.SUPERVISOR_MAX_COP:
-            self.metrics.document_type_escalations += 1
-            return "manager_review", "Credit note - Requires management review by policy"
+        if monto_cop <= self._supervisor_max_cop:
+            self.metrics.increment("document_type_escalations")
+            return _CREDIT_NOTE_MANAGER
         else:
-            return "executive_review", "High-amount credit note - Requires executive approval"
+            return _CREDIT_NOTE_EXECUTIVE
     
-    def _route_email(self, monto_cop: float, risk_score: float, errors: list, 
-                    doc_rules: dict) -> Tuple[str, str]:
+    def _route_email(self, doc_type: str, monto_cop: float, monto_usd: float,
+                     risk_score: float, errors: list, doc_rules: dict) -> Tuple[str, str]:
         """Email invoices are more restrictive """
         if (monto_cop <= doc_rules['max_auto_approval'] and 
             risk_score < 0.2 and len(errors) == 0):
-            return "supervisor_review", "Email - Requires minimum supervision"
-        elif monto_cop <= self.policies.SUPERVISOR_MAX_COP:
-            self.metrics.document_type_escalations += 1
-            return "manager_review", "Medium-amount email - Escalated by document type"
-        else:
-            return "executive_review", "High-amount email - Maximum review required"
-    
-    def _route_formal_invoice(self, monto_cop: float, monto_usd: float, 
-                             risk_score: float, errors: list) -> Tuple[str, str]:
-        """Formal invoices follow standard logic """
-        if (monto_cop <= self.policies.AUTO_APPROVAL_COP and 
-            monto_usd <= self.policies.AUTO_APPROVAL_USD and
-            risk_score < 0.3 and len(errors) == 0):
-            
-            return "auto_approved", "Formal invoice, low amount, acceptable risk score"
-            
-        elif (monto_cop <= self.policies.SUPERVISOR_MAX_COP and 
-              monto_usd <= self.policies.SUPERVISOR_MAX_USD):
-            return "supervisor_review", "Formal invoice, medium amount"
-            
-        elif (monto_cop <= self.policies.MANAGER_MAX_COP and 
-              monto_usd <= self.policies.MANAGER_MAX_USD):
-            return "manager_review", "Formal invoice, high amount"
+            return _EMAIL_SUPERVISOR
+        elif monto_cop <= self._supervisor_max_cop:
+            self.metrics.increment("document_type_escalations")
+            return _EMAIL_MANAGER
         else:
-            return "executive_review", "Formal invoice, very high amount"
+            return _EMAIL_EXECUTIVE
     
-    def _route_other_document(self, doc_type: str, monto_cop: float, 
-                             risk_score: float, doc_rules: dict) -> Tuple[str, str]:
+    def _route_other_document(self, doc_type: str, monto_cop: float, monto_usd: float,
+                              risk_score: float, errors: list, doc_rules: dict) -> Tuple[str, str]:
         """Route JSON and other document types """
+        supervisor, manager, executive = _other_document_routes(doc_type)
         if monto_cop <= doc_rules['max_auto_approval'] and risk_score < 0.25:
-            return "supervisor_review", f"Document {doc_type} - Supervision by precaution"
-        elif monto_cop <= self.policies.MANAGER_MAX_COP:
-            self.metrics.document_type_escalations += 1
-            return "manager_review", f"Document {doc_type} - Amount requires management"
+            return supervisor
+        elif monto_cop <= self._manager_max_cop:
+            self.metrics.increment("document_type_escalations")
+            return manager
         else:
-            return "executive_review", f"Document {doc_type} - High amount requires executives"
+            return executive
     
     def _update_approval_metrics(self, decision: str) -> None:
         """Update approval metrics based on decision """
-        if decision == "auto_approved":
-            self.metrics.auto_approved += 1
-        elif decision == "supervisor_review":
-            self.metrics.supervisor_review += 1  
-        elif decision == "manager_review":
-            self.metrics.manager_review += 1
-        elif decision == "executive_review":
-            self.metrics.executive_review += 1
-        elif decision == "rejected":
-            self.metrics.rejected += 1
\ No newline at end of file
+        self.metrics.record_decision(decision)
\ No newline at end of file
@@ -2,9 +2,11 @@
 """
 Data extraction processor using LLM
 """
-import json
+import re
 import time
+import threading
 from typing import Dict, Tuple
+import orjson
 from langchain_anthropic import ChatAnthropic
 
 from ..models.state import EnhancedProcessingState
@@ -14,6 +16,28 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Regex patterns for the fallback extractor, compiled once at import
+_FALLBACK_PATTERNS = (
+    ("numero_factura", re.compile(r'(?:factura|invoice|number)[\s:]*([A-Z0-9\-]+)', re.IGNORECASE)),
+    ("monto_total", re.compile(r'(?:total|amount)[\s:]*[\$]?([0-9,\.]+)', re.IGNORECASE)),
+    ("moneda", re.compile(r'(USD|COP|EUR|MXN)', re.IGNORECASE)),
+)
+
+# Extraction prompt templates by (document type, language); only {content} varies
+_JSON_SHAPE = '{{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha":"YYYY-MM-DD"}}'
+
+_PROMPTS = {
+    ("formal_invoice", "spanish"): "Factura formal española. Extrae JSON:\n{content}\nRetorna: " + _JSON_SHAPE,
+    ("email", "english"): "Email invoice. Extract JSON:\n{content}\nReturn: " + _JSON_SHAPE,
+    ("credit_note", "spanish"): "Nota de crédito. Extrae JSON:\n{content}\nFormato: " + _JSON_SHAPE,
+    ("json", "english"): "JSON invoice normalization:\n{content}\nFormat: " + _JSON_SHAPE,
+}
+
+_DEFAULT_PROMPT = "Extract invoice data JSON:\n{content}\nFormat: " + _JSON_SHAPE
+
+# Markdown code fence around the JSON payload (``` or ```json)
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*```\s*$', re.DOTALL)
+
 class DataExtractor:
     """Extracts structured data from invoice content using LLM"""
     
@@ -29,6 +53,10 @@ class DataExtractor:
             temperature=self.settings.temperature
         )
         
+        # Shared across worker threads so concurrent calls stay spaced out
+        self._rate_limit_lock = threading.Lock()
+        self._next_call_time = 0.0
+        
         logger.info("DataExtractor initialized successfully")
     
     def extract_data_with_optimization(self, state: EnhancedProcessingState) -> EnhancedProcessingState:
@@ -37,22 +65,22 @@ class DataExtractor:
         """
         logger.info(f"Starting data extraction for invoice {state['invoice_id']}")
         
-        doc_type = state["document_type"]
-        language = state["language"]
-        content = state["raw_content"][:self.settings.max_content_length]
+        # Only truncate over-long content; short invoices reuse the original string
+        limit = self.settings.max_content_length
+        content = raw if len(raw := state["raw_content"]) <= limit else raw[:limit]
         
         # Get appropriate prompt 
-        prompt = self._get_extraction_prompt(doc_type, language, content)
+        prompt = self._get_extraction_prompt(state["document_type"], state["language"], content)
         
         try:
             # Apply rate limiting
-            if self.settings.rate_limit_delay > 0:
-                time.sleep(self.settings.rate_limit_delay)
+            self._wait_for_rate_limit()
             
             # Call LLM
             logger.debug(f"Calling LLM for invoice {state['invoice_id']}")
             response = self.llm.invoke(prompt)
-            self.metrics.api_calls_used += 1
+            with self.metrics.lock:
+                self.metrics.api_calls_used += 1
             
             # Parse response 
             extracted_data = self._parse_llm_response(response.content)
@@ -77,55 +105,43 @@ class DataExtractor:
         
         return state
     
+    def _wait_for_rate_limit(self) -> None:
+        """
+        Keep LLM calls at least rate_limit_delay apart, across all threads
+        """
+        delay = self.settings.rate_limit_delay
+        if delay <= 0:
+            return
+        
+        with self._rate_limit_lock:
+            now = time.monotonic()
+            wait = self._next_call_time - now
+            self._next_call_time = max(now, self._next_call_time) + delay
+        
+        if wait > 0:
+            time.sleep(wait)
+    
     def _get_extraction_prompt(self, doc_type: str, language: str, content: str) -> str:
         """
         Get appropriate extraction prompt based on document type and language
         
         """
-        # extraction prompts
-        extraction_prompts = {
-            ("formal_invoice", "spanish"): f"""Factura formal española. Extrae JSON:
-{content}
-Retorna: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha":"YYYY-MM-DD"}}""",
-            
-            ("email", "english"): f"""Email invoice. Extract JSON:
-{content}
-Return: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha":"YYYY-MM-DD"}}""",
-            
-            ("credit_note", "spanish"): f"""Nota de crédito. Extrae JSON:
-{content}
-Formato: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha":"YYYY-MM-DD"}}""",
-            
-            ("json", "english"): f"""JSON invoice normalization:
-{content}
-Format: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha":"YYYY-MM-DD"}}"""
-        }
-        
-        prompt_key = (doc_type, language)
-        if prompt_key in extraction_prompts:
-            return extraction_prompts[prompt_key]
-        else:
-            return f"""Extract invoice data JSON:
-{content}
-Format: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha":"YYYY-MM-DD"}}"""
+        template = _PROMPTS.get((doc_type, language), _DEFAULT_PROMPT)
+        return template.format(content=content)
     
     def _parse_llm_response(self, response_content: str) -> Dict:
         """
         Parse LLM response and extract JSON data 
         """
-        json_str = response_content.strip()
-        
         # Remove code blocks if present
-        if json_str.startswith('```json'):
-            json_str = json_str[7:-3]
-        elif json_str.startswith('```'):
-            json_str = json_str[3:-3]
+        fence = _FENCE_RE.match(response_content)
+        json_str = fence.group(1) if fence else response_content.strip()
         
         # Parse JSON
         try:
-            extracted = json.loads(json_str)
+            extracted = orjson.loads(json_str)
             return extracted
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:  # subclass of json.JSONDecodeError
             logger.warning(f"JSON parsing failed: {e}")
             # Fallback to regex patterns
             return self._fallback_extraction(response_content)
@@ -134,8 +150,6 @@ Format: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha"
         """
         Fallback extraction using regex patterns when JSON parsing fails
         """
-        import re
-        
         extracted = {
             "numero_factura": "",
             "proveedor": "",
@@ -144,15 +158,8 @@ Format: {{"numero_factura":"","proveedor":"","monto_total":0,"moneda":"","fecha"
             "fecha": ""
         }
         
-        # Basic regex patterns for fallback
-        patterns = {
-            "numero_factura": r'(?:factura|invoice|number)[\s:]*([A-Z0-9\-]+)',
-            "monto_total": r'(?:total|amount)[\s:]*[\$]?([0-9,\.]+)',
-            "moneda": r'(USD|COP|EUR|MXN)',
-        }
-        
-        for field, pattern in patterns.items():
-            match = re.search(pattern, content, re.IGNORECASE)
+        for field, pattern in _FALLBACK_PATTERNS:
+            match = pattern.search(content)
             if match:
                 value = match.group(1).strip()
                 if field == "monto_total":
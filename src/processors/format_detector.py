@@ -2,19 +2,62 @@
 """
 Document format and language detection processor
 """
-import hashlib
-from typing import List, Tuple
+import threading
+from collections import OrderedDict
+import xxhash
+from typing import FrozenSet, List, Set, Tuple
 from ..models.state import EnhancedProcessingState
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+try:
+    import ahocorasick  # pyahocorasick, optional single-pass matcher
+except ImportError:
+    ahocorasick = None  # fall back to one substring check per unique pattern
+
+def _with_score_bounds(pattern_sets: List[Tuple[str, FrozenSet[str]]]) -> List[Tuple[str, FrozenSet[str], int]]:
+    """
+    Attach to each category the best score it or any later category can reach 
+    
+    Order is preserved, so the first category still wins ties.
+    """
+    bounded = []
+    bound = 0
+    for name, patterns in reversed(pattern_sets):
+        bound = max(bound, len(patterns))
+        bounded.append((name, patterns, bound))
+    bounded.reverse()
+    return bounded
+
+def _best_category(categories: List[Tuple[str, FrozenSet[str], int]], found: Set[str]) -> str:
+    """
+    Category with the most patterns in found; "unknown" when none match 
+    """
+    best = "unknown"
+    max_score = 0
+    reachable = len(found)  # no category can match more patterns than were found
+    
+    for name, patterns, bound in categories:
+        # Stop once no remaining category can strictly beat the current best
+        if max_score >= bound or max_score >= reachable:
+            break
+        score = len(patterns & found)
+        if score > max_score:
+            max_score = score
+            best = name
+    
+    return best
+
 class FormatDetector:
     """Detects document format and language from content"""
     
-    def __init__(self, enable_caching: bool = True):
+    def __init__(self, enable_caching: bool = True, cache_max: int = 4096):
         self.enable_caching = enable_caching
-        self.content_cache = {} if enable_caching else None
+        # Bounded LRU: least recently used entries are evicted past cache_max
+        self.content_cache = OrderedDict() if enable_caching else None
+        self.cache_max = cache_max
+        self._cache_lock = threading.Lock()  # invoices may run on worker threads
         
         # Document type detection patterns 
         self.doc_patterns = [
@@ -30,6 +73,25 @@ class FormatDetector:
             "english": ["invoice", "client", "vendor", "date", "amount", "tax"],
             "portuguese": ["fatura", "cliente", "fornecedor", "data", "valor"]
         }
+        
+        # Unique patterns across both tables, scanned once per invoice
+        self._all_patterns = tuple(dict.fromkeys(
+            [p for _, patterns in self.doc_patterns for p in patterns] +
+            [p for patterns in self.lang_patterns.values() for p in patterns]
+        ))
+        self._doc_pattern_sets = _with_score_bounds([
+            (dtype, frozenset(patterns)) for dtype, patterns in self.doc_patterns
+        ])
+        self._lang_pattern_sets = _with_score_bounds([
+            (lang, frozenset(patterns)) for lang, patterns in self.lang_patterns.items()
+        ])
+        
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern in self._all_patterns:
+                self._automaton.add_word(pattern, pattern)
+            self._automaton.make_automaton()
     
     def detect_format_and_language(self, state: EnhancedProcessingState) -> EnhancedProcessingState:
         """
@@ -37,24 +99,33 @@ class FormatDetector:
         """
         logger.info(f"Starting format detection for invoice {state['invoice_id']}")
         
-        content = state["raw_content"].lower()
-        
         # Handle caching if enabled
         if self.enable_caching:
-            content_hash = hashlib.md5(state["raw_content"].encode()).hexdigest()
+            # Non-cryptographic key: xxh3 is much faster than md5 for cache lookups
+            content_hash = xxhash.xxh3_128_hexdigest(state["raw_content"].encode())
             state["content_hash"] = content_hash
             
-            if content_hash in self.content_cache:
-                cached_result = self.content_cache[content_hash]
+            with self._cache_lock:
+                cached_result = self.content_cache.get(content_hash)
+                if cached_result is not None:
+                    self.content_cache.move_to_end(content_hash)
+            
+            if cached_result is not None:
                 state.update(cached_result)
                 logger.info(f"Cache hit for invoice {state['invoice_id']}")
                 return state
         
+        # Patterns are lowercase; the lowered copy is only made on a cache miss
+        content = state["raw_content"].lower()
+        
+        # Single scan shared by both detectors
+        found = self._find_patterns(content)
+        
         # Detect document type 
-        doc_type = self._detect_document_type(content)
+        doc_type = self._detect_document_type(found)
         
         # Detect language 
-        language = self._detect_language(content)
+        language = self._detect_language(found)
         
         # Update state
         state["document_type"] = doc_type
@@ -68,7 +139,10 @@ class FormatDetector:
                 "language": language,
                 "processing_status": "format_detected"
             }
-            self.content_cache[content_hash] = cache_data
+            with self._cache_lock:
+                self.content_cache[content_hash] = cache_data
+                if len(self.content_cache) > self.cache_max:
+                    self.content_cache.popitem(last=False)
         
         logger.info(
             f"Invoice {state['invoice_id']}: detected type={doc_type}, language={language}"
@@ -76,32 +150,23 @@ class FormatDetector:
         
         return state
     
-    def _detect_document_type(self, content: str) -> str:
+    def _find_patterns(self, content: str) -> Set[str]:
+        """
+        Return the set of known patterns that occur in the lowercased content 
+        """
+        if self._automaton is not None:
+            # Aho-Corasick reports overlapping hits (e.g. "client" inside "cliente")
+            return {pattern for _, pattern in self._automaton.iter(content)}
+        return {pattern for pattern in self._all_patterns if pattern in content}
+    
+    def _detect_document_type(self, found: Set[str]) -> str:
         """
         Detect document type based on content patterns 
         """
-        doc_type = "unknown"
-        max_score = 0
-        
-        for dtype, patterns in self.doc_patterns:
-            score = sum(1 for pattern in patterns if pattern in content)
-            if score > max_score:
-                max_score = score
-                doc_type = dtype
-        
-        return doc_type
+        return _best_category(self._doc_pattern_sets, found)
     
-    def _detect_language(self, content: str) -> str:
+    def _detect_language(self, found: Set[str]) -> str:
         """
         Detect content language based on keyword patterns 
         """
-        language = "unknown"
-        max_lang_score = 0
-        
-        for lang, patterns in self.lang_patterns.items():
-            score = sum(1 for pattern in patterns if pattern in content)
-            if score > max_lang_score:
-                max_lang_score = score
-                language = lang
-        
-        return language
\ No newline at end of file
+        return _best_category(self._lang_pattern_sets, found)
\ No newline at end of file
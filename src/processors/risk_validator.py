@@ -2,37 +2,138 @@
 """
 Risk validation and scoring processor
 """
+import logging
+import sys
 from datetime import datetime
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 from ..models.state import EnhancedProcessingState
-from ..models.metrics import ProcessingMetrics
+from ..models.metrics import COUNTER_INDEX, ProcessingMetrics
 from ..config.policies import ApprovalPolicies
 from ..utils.logger import get_logger
+from ._risk_kernels import score_invoice
 
 logger = get_logger(__name__)
 
+# Slots of ProcessingMetrics.anomaly_counts updated by the validator
+_VALIDATION_ERRORS = COUNTER_INDEX["validation_errors_count"]
+_CRITICAL_ANOMALIES = COUNTER_INDEX["critical_anomalies_detected"]
+_HIGH_RISK_SCORES = COUNTER_INDEX["high_risk_scores"]
+
+# Entries kept per policy memo; lookups past the limit go to the policies
+_POLICY_MEMO_MAXSIZE = 1024
+
+def _is_iso_date(fecha: str) -> bool:
+    """True for ASCII YYYY-MM-DD strings (shape only, the date may not exist) """
+    return (len(fecha) == 10 and fecha[4] == '-' and fecha[7] == '-' and fecha.isascii() and
+            fecha[:4].isdigit() and fecha[5:7].isdigit() and fecha[8:].isdigit())
+
+def _fecha_format(fecha: str) -> Optional[str]:
+    """
+    The only accepted date format that could match fecha, or None 
+    
+    Accepted formats are %Y-%m-%d, %d/%m/%Y, %Y-%m and %m/%Y. %Y is always
+    four digits, so a dash at index 4 means a year-first date; the number of
+    separators then tells the day and month variants apart.
+    """
+    if fecha[4:5] == '-':
+        return '%Y-%m-%d' if fecha.count('-') == 2 else '%Y-%m'
+    if '/' in fecha:
+        return '%d/%m/%Y' if fecha.count('/') == 2 else '%m/%Y'
+    return None
+
+@lru_cache(maxsize=8192)
+def _parse_fecha_cached(fecha: str) -> Optional[datetime]:
+    """
+    Parse an invoice date with the first matching format, or None 
+    
+    Invoices from one vendor or month repeat the same dates, so results are
+    memoized; canonical YYYY-MM-DD dates skip strptime entirely and other
+    dates need at most one strptime call.
+    """
+    if _is_iso_date(fecha):
+        try:
+            return datetime(int(fecha[:4]), int(fecha[5:7]), int(fecha[8:]))
+        except ValueError:
+            pass  # e.g. month 13: let strptime decide as before
+    
+    fmt = _fecha_format(fecha)
+    if fmt is None:
+        return None
+    try:
+        return datetime.strptime(fecha, fmt)
+    except ValueError:
+        return None
+
+def _scan_fields(data: Dict, field_msgs: Tuple[Tuple[str, str, str], ...],
+                 errors: List, anomalies: List) -> int:
+    """
+    Single pass over the critical fields: record missing ones, count complete ones 
+    
+    field_msgs holds (field, error message, anomaly key) triples. Strings are
+    checked with strip() directly; other truthy values (numbers from the
+    extracted JSON) never render blank, so they skip the str() conversion.
+    """
+    complete = 0
+    for field, error_msg, anomaly in field_msgs:
+        value = data.get(field)
+        if value and (value.strip() if isinstance(value, str) else True):
+            complete += 1
+        else:
+            errors.append(error_msg)
+            anomalies.append(anomaly)
+    return complete
+
 class RiskValidator:
     """Validates invoice data and calculates multi-factor risk scores"""
     
+    # Thousands separators and currency symbol dropped in one translate pass
+    _AMOUNT_STRIP = str.maketrans("", "", ",$")
+    
     def __init__(self, policies: ApprovalPolicies, metrics: ProcessingMetrics):
         self.policies = policies
         self.metrics = metrics
+        
+        # Critical fields read once; validation and completeness share one scan.
+        # Each field carries its prebuilt error message and (interned) anomaly key
+        self._critical_fields = tuple(policies.CRITICAL_FIELDS)
+        self._n_critical = len(self._critical_fields)
+        field_msgs = []
+        for field in self._critical_fields:
+            error_msg = f"{field.replace('_', ' ').title()} faltante"
+            field_msgs.append((field, error_msg, sys.intern(error_msg.lower())))
+        self._critical_field_msgs = tuple(field_msgs)
+        
+        # Memoized policy answers; document types and anomaly texts are a small
+        # vocabulary, capped at _POLICY_MEMO_MAXSIZE entries each
+        self._risk_multipliers: Dict[str, float] = {}
+        self._critical_anomaly_memo: Dict[str, bool] = {}
+        
+        # Risk weights in kernel order; a tuple of floats compiles to a fixed
+        # float64 x 4 under numba and keeps plain-float results without it
+        weights = policies.RISK_FACTORS
+        self._risk_weights = (
+            float(weights['validation_errors']),
+            float(weights['document_type']),
+            float(weights['amount_threshold']),
+            float(weights['data_completeness'])
+        )
         logger.info("RiskValidator initialized with enhanced scoring")
     
     def enhanced_validate_and_score_risk(self, state: EnhancedProcessingState) -> EnhancedProcessingState:
         """
         Main validation function with enhanced risk scoring 
         """
-        logger.info(f"Starting risk validation for invoice {state['invoice_id']}")
+        logger.info("Starting risk validation for invoice %s", state['invoice_id'])
         
         data = state["extracted_data"]
         errors = []
         anomalies = []
         compliance_flags = []
         
-        # 1. Critical fields validation 
-        self._validate_critical_fields(data, errors, anomalies)
+        # 1. Critical fields validation (also counts the complete ones)
+        complete_fields = _scan_fields(data, self._critical_field_msgs, errors, anomalies)
         
         # 2. Amount validation and normalization 
         monto_normalized, amount_risk = self._validate_amount(data, errors, anomalies, compliance_flags)
@@ -41,15 +142,26 @@ class RiskValidator:
         self._validate_date(data, errors, compliance_flags)
         
         # 4. Calculate composite risk score 
-        risk_factors = self._calculate_risk_factors(
-            state, errors, amount_risk, data
+        risk_factors, final_risk_score = self._calculate_risk_factors(
+            state, errors, amount_risk, complete_fields
         )
         
-        final_risk_score = self._calculate_final_risk_score(risk_factors)
-        
         # 5. Detect critical anomalies
-        self._detect_critical_anomalies(anomalies, compliance_flags)
+        critical = self._detect_critical_anomalies(anomalies, compliance_flags)
         
+        self._apply_validation_results(
+            state, errors, anomalies, compliance_flags, risk_factors, final_risk_score
+        )
+        
+        # Update metrics
+        self._update_metrics(errors, final_risk_score, critical)
+        
+        return state
+    
+    def _apply_validation_results(self, state: EnhancedProcessingState, errors: List, anomalies: List,
+                                  compliance_flags: List, risk_factors: Dict[str, float],
+                                  final_risk_score: float) -> None:
+        """Write validation results into the state """
         # Update state
         state["validation_errors"] = errors
         state["risk_score"] = min(final_risk_score, 1.0)
@@ -58,23 +170,12 @@ class RiskValidator:
         state["compliance_flags"] = compliance_flags
         state["processing_status"] = "validated" if not errors else "validation_failed"
         
-        # Update metrics
-        self._update_metrics(errors, final_risk_score)
-        
-        logger.info(
-            f"Invoice {state['invoice_id']}: validation completed, "
-            f"risk_score={final_risk_score:.3f}, errors={len(errors)}"
-        )
-        
-        return state
-    
-    def _validate_critical_fields(self, data: Dict, errors: List, anomalies: List) -> None:
-        """Validate presence of critical fields """
-        for field in self.policies.CRITICAL_FIELDS:
-            if not data.get(field) or str(data.get(field)).strip() == "":
-                error_msg = f"{field.replace('_', ' ').title()} faltante"
-                errors.append(error_msg)
-                anomalies.append(error_msg.lower())
+        # Deferred formatting: skipped entirely when INFO is filtered out
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Invoice %s: validation completed, risk_score=%.3f, errors=%d",
+                state['invoice_id'], final_risk_score, len(errors)
+            )
     
     def _validate_amount(self, data: Dict, errors: List, anomalies: List, 
                         compliance_flags: List) -> Tuple[float, float]:
@@ -83,7 +184,7 @@ class RiskValidator:
         amount_risk = 0.0
         
         try:
-            monto_str = str(data.get("monto_total", "0")).replace(",", "").replace("$", "")
+            monto_str = str(data.get("monto_total", "0")).translate(self._AMOUNT_STRIP)
             monto = float(monto_str)
             
             if monto <= 0:
@@ -117,81 +218,92 @@ class RiskValidator:
     
     def _validate_date(self, data: Dict, errors: List, compliance_flags: List) -> None:
         """Validate date format and content """
-        fecha = data.get("fecha")
-        if fecha and str(fecha).strip():
-            try:
-                fecha_formats = ['%Y-%m-%d', '%d/%m/%Y', '%Y-%m', '%m/%Y']
-                parsed_date = None
-                
-                for fmt in fecha_formats:
-                    try:
-                        parsed_date = datetime.strptime(str(fecha)[:10], fmt)
-                        break
-                    except ValueError:
-                        continue
+        fecha = self._fecha_to_validate(data)
+        if fecha is None:
+            return
+        
+        try:
+            parsed_date = _parse_fecha_cached(fecha)
+            
+            if not parsed_date:
+                self._flag_invalid_date(errors, compliance_flags)
                 
-                if not parsed_date:
-                    errors.append("Formato de fecha inválido")
-                    compliance_flags.append("Fecha con formato irregular")
-                    
-            except Exception:
-                errors.append("Fecha no procesable")
-                compliance_flags.append("Fecha corrupta")
+        except Exception:
+            errors.append("Fecha no procesable")
+            compliance_flags.append("Fecha corrupta")
+    
+    def _fecha_to_validate(self, data: Dict) -> Optional[str]:
+        """The date text to validate (first 10 chars), or None when absent or blank """
+        fecha = data.get("fecha")
+        if not fecha:
+            return None
+        
+        # Converted once; both the blank check and the parser use it
+        fecha_str = str(fecha)
+        return fecha_str[:10] if fecha_str.strip() else None
+    
+    def _flag_invalid_date(self, errors: List, compliance_flags: List) -> None:
+        """Record an unparseable invoice date """
+        errors.append("Formato de fecha inválido")
+        compliance_flags.append("Fecha con formato irregular")
     
     def _calculate_risk_factors(self, state: EnhancedProcessingState, errors: List, 
-                               amount_risk: float, data: Dict) -> Dict[str, float]:
-        """Calculate individual risk factor scores """
-        risk_factors = {}
-        
-        # Factor 1: Validation errors (40% weight)
-        validation_risk = min(len(errors) * 0.25, 1.0)
-        risk_factors['validation_errors'] = validation_risk
-        
-        # Factor 2: Document type (20% weight)  
-        doc_type = state["document_type"]
-        doc_rules = self.policies.get_document_rules(doc_type)
-        document_risk = (doc_rules['risk_multiplier'] - 1.0) * 2  # Normalize to 0-1
-        risk_factors['document_type'] = document_risk
-        
-        # Factor 3: Amount threshold (20% weight)
-        risk_factors['amount_threshold'] = amount_risk
-        
-        # Factor 4: Data completeness (20% weight)
-        total_fields = len(self.policies.CRITICAL_FIELDS)
-        complete_fields = sum(
-            1 for field in self.policies.CRITICAL_FIELDS 
-            if data.get(field) and str(data.get(field)).strip()
-        )
-        completeness_risk = 1.0 - (complete_fields / total_fields) if total_fields > 0 else 0.0
-        risk_factors['data_completeness'] = completeness_risk
-        
-        return risk_factors
-    
-    def _calculate_final_risk_score(self, risk_factors: Dict[str, float]) -> float:
-        """Calculate weighted final risk score """
-        final_risk_score = (
-            risk_factors['validation_errors'] * self.policies.RISK_FACTORS['validation_errors'] +
-            risk_factors['document_type'] * self.policies.RISK_FACTORS['document_type'] +
-            risk_factors['amount_threshold'] * self.policies.RISK_FACTORS['amount_threshold'] +
-            risk_factors['data_completeness'] * self.policies.RISK_FACTORS['data_completeness']
+                               amount_risk: float, complete_fields: int) -> Tuple[Dict[str, float], float]:
+        """Calculate individual risk factor scores and the weighted final score """
+        validation_risk, document_risk, completeness_risk, final_risk_score = score_invoice(
+            len(errors), self._risk_multiplier(state["document_type"]), amount_risk,
+            complete_fields, self._n_critical,
+            self._risk_weights
         )
         
-        return final_risk_score
-    
-    def _detect_critical_anomalies(self, anomalies: List, compliance_flags: List) -> None:
-        """Detect and flag critical anomalies """
-        critical_anomalies = [
-            anom for anom in anomalies 
-            if self.policies.is_critical_anomaly(anom)
-        ]
+        # Weights: validation 40%, document type 20%, amount 20%, completeness 20%
+        risk_factors = {
+            'validation_errors': validation_risk,
+            'document_type': document_risk,
+            'amount_threshold': amount_risk,
+            'data_completeness': completeness_risk
+        }
         
-        if critical_anomalies:
-            self.metrics.critical_anomalies_detected += 1
+        return risk_factors, final_risk_score
+    
+    def clear_caches(self) -> None:
+        """Drop memoized parse and policy results (e.g. between test runs) """
+        _parse_fecha_cached.cache_clear()
+        self._risk_multipliers.clear()
+        self._critical_anomaly_memo.clear()
+    
+    def _risk_multiplier(self, doc_type: str) -> float:
+        """Document type risk multiplier, looked up in the policies once per type """
+        multiplier = self._risk_multipliers.get(doc_type)
+        if multiplier is None:
+            multiplier = self.policies.get_document_rules(doc_type)['risk_multiplier']
+            if len(self._risk_multipliers) < _POLICY_MEMO_MAXSIZE:
+                self._risk_multipliers[doc_type] = multiplier
+        return multiplier
+    
+    def _is_critical_anomaly(self, anomaly: str) -> bool:
+        """Memoized policies.is_critical_anomaly """
+        critical = self._critical_anomaly_memo.get(anomaly)
+        if critical is None:
+            critical = self.policies.is_critical_anomaly(anomaly)
+            if len(self._critical_anomaly_memo) < _POLICY_MEMO_MAXSIZE:
+                self._critical_anomaly_memo[anomaly] = critical
+        return critical
+    
+    def _detect_critical_anomalies(self, anomalies: List, compliance_flags: List) -> bool:
+        """Detect and flag critical anomalies, return whether any was found """
+        if any(self._is_critical_anomaly(anom) for anom in anomalies):
             compliance_flags.append("Anomalías críticas detectadas")
+            return True
+        return False
     
-    def _update_metrics(self, errors: List, final_risk_score: float) -> None:
+    def _update_metrics(self, errors: List, final_risk_score: float, critical: bool) -> None:
         """Update processing metrics """
-        if errors:
-            self.metrics.validation_errors_count += 1
-        if final_risk_score > 0.7:
-            self.metrics.high_risk_scores += 1
\ No newline at end of file
+        counts = self.metrics.anomaly_counts
+        with self.metrics.lock:
+            if errors:
+                counts[_VALIDATION_ERRORS] += 1
+            if critical:
+                counts[_CRITICAL_ANOMALIES] += 1
+            if final_risk_score > 0.7:
+                counts[_HIGH_RISK_SCORES] += 1
\ No newline at end of file
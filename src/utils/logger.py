@@ -3,16 +3,49 @@
 Structured logging configuration for invoice processing
 """
 import logging
+import os
 import sys
+from functools import lru_cache
 from typing import Optional
 
+from ..config.settings import get_settings
+
+# Resolved once at import instead of on every setup_logger call
+_DEFAULT_FORMATTER = logging.Formatter(
+    "%(asctime)s | %(name)s | %(levelname)s | "
+    "%(filename)s:%(lineno)d | %(message)s"
+)
+
+_LEVELS = {
+    "CRITICAL": logging.CRITICAL,
+    "FATAL": logging.FATAL,
+    "ERROR": logging.ERROR,
+    "WARNING": logging.WARNING,
+    "WARN": logging.WARN,
+    "INFO": logging.INFO,
+    "DEBUG": logging.DEBUG,
+    "NOTSET": logging.NOTSET
+}
+
+def _configured_level() -> str:
+    """Settings.log_level; LOG_LEVEL directly when the settings cannot load yet"""
+    try:
+        return get_settings().log_level
+    except ValueError:
+        # e.g. no API key: the level still comes from the same variable
+        return os.getenv("LOG_LEVEL", "INFO")
+
+@lru_cache(maxsize=256)
 def setup_logger(
     name: str = "cobre_processor",
-    level: str = "INFO",
+    level: Optional[str] = None,
     format_string: Optional[str] = None
 ) -> logging.Logger:
     """
     Set up structured logger with appropriate formatting
+    
+    Without an explicit level, Settings.log_level (LOG_LEVEL, default INFO)
+    is used, so production runs can set WARNING and skip per-invoice INFO records.
     """
     logger = logging.getLogger(name)
     
@@ -21,21 +54,20 @@ def setup_logger(
         return logger
     
     # Set log level
-    numeric_level = getattr(logging, level.upper(), logging.INFO)
+    if level is None:
+        level = _configured_level()
+    numeric_level = _LEVELS.get(level.upper(), logging.INFO)
     logger.setLevel(numeric_level)
     
     # Create console handler
     handler = logging.StreamHandler(sys.stdout)
     handler.setLevel(numeric_level)
     
-    # Create formatter
+    # Create formatter (the default one is shared by all handlers)
     if format_string is None:
-        format_string = (
-            "%(asctime)s | %(name)s | %(levelname)s | "
-            "%(filename)s:%(lineno)d | %(message)s"
-        )
-    
-    formatter = logging.Formatter(format_string)
+        formatter = _DEFAULT_FORMATTER
+    else:
+        formatter = logging.Formatter(format_string)
     handler.setFormatter(formatter)
     
     # Add handler to logger
@@ -43,6 +75,7 @@ def setup_logger(
     
     return logger
 
+@lru_cache(maxsize=256)
 def get_logger(name: str) -> logging.Logger:
     """
     Get logger instance for a specific module
@@ -2,8 +2,12 @@
 """
 Main LangGraph workflow that orchestrates invoice processing
 """
+import threading
 import time
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
+from types import MappingProxyType
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
 from langgraph.graph import StateGraph, END
 
 from ..models.state import EnhancedProcessingState
@@ -19,6 +23,30 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Initial state shared by every invoice; only the per-invoice keys are set on
+# copy. The empty containers are immutable because processors always assign
+# fresh values to these keys rather than mutating them.
+_EMPTY_DICT = MappingProxyType({})
+_EMPTY_LIST = ()
+
+_INITIAL_STATE = MappingProxyType({
+    "invoice_id": 0,
+    "raw_content": "",
+    "content_hash": "",
+    "document_type": "",
+    "language": "",
+    "extracted_data": _EMPTY_DICT,
+    "validation_errors": _EMPTY_LIST,
+    "risk_score": 0.0,
+    "risk_factors": _EMPTY_DICT,
+    "anomalies_detected": _EMPTY_LIST,
+    "compliance_flags": _EMPTY_LIST,
+    "approval_decision": "",
+    "processing_status": "started",
+    "final_output": _EMPTY_DICT,
+    "processing_start_time": 0
+})
+
 class InvoiceWorkflow:
     """
     Main workflow class that orchestrates the entire invoice processing pipeline
@@ -29,17 +57,44 @@ class InvoiceWorkflow:
         self.policies = ApprovalPolicies()
         self.metrics = ProcessingMetrics()
         
-        # Initialize all processors 
-        self.format_detector = FormatDetector(enable_caching=self.settings.enable_caching)
-        self.data_extractor = DataExtractor(metrics=self.metrics)
-        self.risk_validator = RiskValidator(policies=self.policies, metrics=self.metrics)
-        self.approval_router = ApprovalRouter(policies=self.policies, metrics=self.metrics)
-        self.output_generator = OutputGenerator(policies=self.policies)
-        
-        # Create and compile workflow
-        self.workflow = self._create_workflow()
+        # Processors and the compiled graph are built on first use (see the
+        # cached properties below); the lock keeps concurrent first invoices
+        # from compiling the graph twice
+        self._build_lock = threading.Lock()
         
-        logger.info("InvoiceWorkflow initialized successfully with all processors")
+        logger.info("InvoiceWorkflow initialized; processors are built on first use")
+    
+    @cached_property
+    def format_detector(self) -> FormatDetector:
+        return FormatDetector(enable_caching=self.settings.enable_caching)
+    
+    @cached_property
+    def data_extractor(self) -> DataExtractor:
+        return DataExtractor(metrics=self.metrics)
+    
+    @cached_property
+    def risk_validator(self) -> RiskValidator:
+        return RiskValidator(policies=self.policies, metrics=self.metrics)
+    
+    @cached_property
+    def approval_router(self) -> ApprovalRouter:
+        return ApprovalRouter(policies=self.policies, metrics=self.metrics)
+    
+    @cached_property
+    def output_generator(self) -> OutputGenerator:
+        return OutputGenerator(policies=self.policies)
+    
+    @cached_property
+    def workflow(self) -> Any:
+        """Compiled LangGraph workflow, built (with all processors) on first access """
+        with self._build_lock:
+            # Another thread may have compiled it while this one waited
+            compiled = self.__dict__.get("workflow")
+            if compiled is None:
+                compiled = self._create_workflow()
+                self.__dict__["workflow"] = compiled
+                logger.info("InvoiceWorkflow processors initialized")
+            return compiled
     
     def _create_workflow(self) -> Any:
         """
@@ -61,6 +116,8 @@ class InvoiceWorkflow:
         workflow.set_entry_point("detect_format")
         workflow.add_edge("detect_format", "extract_data")
         workflow.add_edge("extract_data", "validate_risk")
+        # Invoices that fail validation are still routed: the router decides
+        # between rejection and human review from their errors
         workflow.add_edge("validate_risk", "route_approval")
         workflow.add_edge("route_approval", "generate_output")
         workflow.add_edge("generate_output", END)
@@ -82,69 +139,115 @@ class InvoiceWorkflow:
         Returns:
             Complete processing results with enhanced analytics
         """
-        logger.info(f"Starting invoice processing workflow for ID {invoice_id}")
-        
-        # Create initial state 
-        initial_state = EnhancedProcessingState(
-            invoice_id=invoice_id,
-            raw_content=content,
-            content_hash="",
-            document_type="",
-            language="",
-            extracted_data={},
-            validation_errors=[],
-            risk_score=0.0,
-            risk_factors={},
-            anomalies_detected=[],
-            compliance_flags=[],
-            approval_decision="",
-            processing_status="started",
-            final_output={},
-            processing_start_time=time.time()
-        )
+        logger.info("Starting invoice processing workflow for ID %s", invoice_id)
+        
+        initial_state = self._create_initial_state(invoice_id, content)
         
         try:
             # Execute workflow
             final_state = self.workflow.invoke(initial_state)
-            
-            # Update global metrics
-            self._update_global_metrics(initial_state["processing_start_time"])
-            
-            result = final_state["final_output"]
-            
-            logger.info(
-                f"Invoice {invoice_id} processed successfully: "
-                f"decision={result.get('approval', {}).get('decision', 'unknown')}, "
-                f"risk={result.get('document_metadata', {}).get('risk_score', 0)}"
-            )
-            
-            return result
+            return self._complete_invoice(invoice_id, initial_state, final_state)
             
         except Exception as e:
-            error_msg = f"Critical processing error: {str(e)}"
-            logger.error(f"Invoice {invoice_id} processing failed: {error_msg}", exc_info=True)
-            
-            self.metrics.errors.append(f"Invoice {invoice_id}: {error_msg}")
+            return self._failed_invoice(invoice_id, e)
+    
+    def process_batch(self, invoices: Iterable[Tuple[int, str]],
+                      max_workers: Optional[int] = None,
+                      on_progress: Optional[Callable[[int, int, int, Optional[Dict[str, Any]]], None]] = None
+                      ) -> List[Dict[str, Any]]:
+        """
+        Process (invoice_id, content) pairs on a thread pool
+        
+        Threads overlap the LLM calls, which dominate each invoice. Shared
+        state is already thread-safe: metrics updates take metrics.lock and
+        the format cache takes its own lock. Defaults to settings.max_workers
+        threads; results keep the input order.
+        
+        on_progress(completed, total, invoice_id, result) is called on the
+        calling thread as each invoice finishes. result is None for an
+        invoice that raised; it is logged and left out of the results.
+        """
+        items = list(invoices)
+        total = len(items)
+        if not items:
+            return []
+        
+        workers = max(1, min(max_workers or self.settings.max_workers, total))
+        ordered: List[Optional[Dict[str, Any]]] = [None] * total
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self.process_single_invoice, invoice_id, content): (position, invoice_id)
+                for position, (invoice_id, content) in enumerate(items)
+            }
             
-            # Return error response 
-            return {
-                "invoice_id": invoice_id,
-                "processing_timestamp": time.time(),
-                "processing_status": "failed",
-                "error": error_msg,
-                "enhanced_risk_analytics": {"processing_failed": True},
-                "integration_ready": {
-                    "payment_system": False, 
-                    "erp_system": False,
-                    "reporting_system": True,
-                    "compliance_check": False
-                }
+            for completed, future in enumerate(as_completed(futures), 1):
+                position, invoice_id = futures[future]
+                try:
+                    ordered[position] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to process invoice {invoice_id}: {e}")
+                    # Continue processing other invoices
+                
+                if on_progress is not None:
+                    on_progress(completed, total, invoice_id, ordered[position])
+        
+        return [result for result in ordered if result is not None]
+    
+    def _create_initial_state(self, invoice_id: int, content: str) -> EnhancedProcessingState:
+        """Create initial state """
+        return {
+            **_INITIAL_STATE,
+            "invoice_id": invoice_id,
+            "raw_content": content,
+            "processing_start_time": time.perf_counter_ns()
+        }
+    
+    def _complete_invoice(self, invoice_id: int, initial_state: EnhancedProcessingState,
+                          final_state: EnhancedProcessingState) -> Dict[str, Any]:
+        """Record metrics for a finished workflow run and return its output """
+        # Update global metrics
+        self._update_global_metrics(initial_state["processing_start_time"])
+        
+        result = final_state["final_output"]
+        
+        logger.info(
+            f"Invoice {invoice_id} processed successfully: "
+            f"decision={result.get('approval', {}).get('decision', 'unknown')}, "
+            f"risk={result.get('document_metadata', {}).get('risk_score', 0)}"
+        )
+        
+        return result
+    
+    def _failed_invoice(self, invoice_id: int, e: Exception) -> Dict[str, Any]:
+        """Build the error response for a workflow run that raised """
+        error_msg = f"Critical processing error: {str(e)}"
+        logger.error(f"Invoice {invoice_id} processing failed: {error_msg}", exc_info=True)
+        
+        self.metrics.errors.append(f"Invoice {invoice_id}: {error_msg}")
+        
+        # Return error response 
+        return {
+            "invoice_id": invoice_id,
+            "processing_timestamp": time.time(),
+            "processing_status": "failed",
+            "error": error_msg,
+            "enhanced_risk_analytics": {"processing_failed": True},
+            "integration_ready": {
+                "payment_system": False, 
+                "erp_system": False,
+                "reporting_system": True,
+                "compliance_check": False
             }
+        }
     
-    def _update_global_metrics(self, start_time: float) -> None:
+    def _update_global_metrics(self, start_ns: int) -> None:
         """Update global processing metrics"""
-        self.metrics.total_processed += 1
-        self.metrics.processing_time_total += (time.time() - start_time)
+        # Monotonic integer clock: immune to wall-clock adjustments
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        with self.metrics.lock:
+            self.metrics.total_processed += 1
+            self.metrics.processing_time_total += elapsed
     
     def get_processing_metrics(self) -> Dict[str, Any]:
         """
@@ -172,4 +275,7 @@ class InvoiceWorkflow:
     def reset_metrics(self) -> None:
         """Reset all processing metrics (useful for testing)"""
         self.metrics = ProcessingMetrics()
+        # Only a validator that was already built has caches to drop
+        if 'risk_validator' in self.__dict__:
+            self.risk_validator.clear_caches()
         logger.info("Processing metrics reset")
\ No newline at end of file
@@ -0,0 +1,49 @@
+# tests/test_streamlit_app.py
+"""
+Tests for the dashboard's CSV upload parsing
+"""
+import csv
+import io
+
+import pandas as pd
+
+from streamlit_app import read_invoice_csv
+
+def _multiline_invoice_csv(min_bytes: int) -> bytes:
+    """CSV shaped like invoices.csv: quoted content spanning several lines"""
+    content = (
+        "FACTURA #F-2025-{n:04d}\n"
+        "TechSolutions México S.A. de C.V.\n"
+        "NIT: 900123456-7\n\n"
+        "CONCEPTO, CANTIDAD, PRECIO\n"
+        "Licencias de Software, 12, \"$2,500,000\"\n"
+        "TOTAL: $45,220,000\n"
+    )
+    buf = io.StringIO()
+    writer = csv.writer(buf, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    writer.writerow(["id", "content"])
+    n = 0
+    while buf.tell() < min_bytes:
+        n += 1
+        writer.writerow([n, content.format(n=n)])
+    return buf.getvalue().encode("utf-8")
+
+def test_read_invoice_csv_multiline_content_over_one_block():
+    data = _multiline_invoice_csv(1_500_000)
+    assert len(data) > 1_000_000
+    
+    df = read_invoice_csv(io.BytesIO(data))
+    
+    expected = pd.read_csv(io.BytesIO(data))
+    assert list(df.columns) == ["id", "content"]
+    assert len(df) == len(expected)
+    assert df["id"].tolist() == expected["id"].tolist()
+    assert df["content"].tolist() == expected["content"].tolist()
+
+def test_read_invoice_csv_keeps_only_id_and_content():
+    data = b'id,vendor,content\n1,Acme,"line one\nline two"\n'
+    
+    df = read_invoice_csv(io.BytesIO(data))
+    
+    assert list(df.columns) == ["id", "content"]
+    assert df["content"].tolist() == ["line one\nline two"]